@@ -6,10 +6,13 @@ Uses a pre-trained instance segmentation model to detect climbing holds.
 Outputs JSON file with polygon coordinates for each detected hold.
 
 Usage:
-    python detect_holds.py <image_path> [--output output.json] [--preview] [--confidence 0.5]
+    python detect_holds.py <image_path> [<image_path> ...] [--output output.json] [--preview] [--confidence 0.5]
+                           [--preview-output preview.jpg] [--compact] [--no-adaptive]
+                           [--no-cache] [--clear-cache] [--workflow workspace/workflow-id]
 
 Requirements:
-    pip install opencv-python numpy requests
+    pip install opencv-python numpy requests scipy orjson
+    pip install numba  # optional, speeds up dedup on large detection counts
 
 Setup:
     export ROBOFLOW_API_KEY=<your_api_key>
@@ -17,98 +20,346 @@ Setup:
 
 import cv2
 import numpy as np
-import json
+import orjson
 import argparse
 import os
 import base64
-import time
+import hashlib
+import shutil
+import tempfile
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict
+from scipy.spatial import cKDTree
+from typing import List, Dict, Optional, Tuple
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, dedup falls back to plain Python
+    def njit(*args, **kwargs):
+        return lambda f: f
 
 # Roboflow model details
 MODEL_ENDPOINT = "hold-detector-rnvkl/2"
 API_URL = f"https://serverless.roboflow.com/{MODEL_ENDPOINT}"
 
+# Optional Roboflow Workflow wrapping the model above. Workflows accept a
+# batch of images, so all tiles can be sent in a single request.
+WORKFLOW_URL = "https://serverless.roboflow.com/infer/workflows/{workflow}"
 
-def deduplicate_predictions(predictions: List[Dict], threshold: float = 20) -> List[Dict]:
-    """Remove duplicate detections based on center proximity."""
-    if not predictions:
-        return []
+# Concurrent API requests (thread pool size and HTTP connection pool size)
+MAX_CONNECTIONS = 16
+
+
+class ReportingRetry(Retry):
+    """urllib3 Retry that prints each retry so a stalled request is visible."""
+
+    def increment(self, method=None, url=None, response=None, error=None, *args, **kwargs):
+        retry = super().increment(method, url, response, error, *args, **kwargs)
+        reason = f"returned {response.status}" if response is not None else f"failed ({error})"
+        print(f"    API {reason}, retrying in {retry.get_backoff_time():g}s...")
+        return retry
 
-    # Filter out predictions with empty points
-    predictions = [p for p in predictions if not ("points" in p and len(p["points"]) == 0)]
+
+def make_session() -> requests.Session:
+    """HTTP session that keeps connections alive and retries server errors.
+
+    Reusing it lets tiles skip the TCP + TLS handshake. The pool is sized to
+    cover all parallel tiles, and urllib3 retries with exponential backoff.
+    """
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=MAX_CONNECTIONS,
+        pool_maxsize=MAX_CONNECTIONS,
+        # 3 attempts in total (first try + 2 retries)
+        max_retries=ReportingRetry(
+            total=2,
+            backoff_factor=0.5,
+            status_forcelist=[500, 502, 503, 504],
+            allowed_methods=["POST"],
+            raise_on_status=False
+        )
+    ))
+    return session
+
+
+# Defaults for callers that don't pass their own session/executor. Encoding
+# always uses the shared pool. Workers are started lazily.
+SESSION = make_session()
+ENCODE_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+IO_POOL = ThreadPoolExecutor(max_workers=MAX_CONNECTIONS)
+
+# JPEG quality for uploaded tiles (OpenCV default is 95). The detector is
+# insensitive to the difference and the payload is ~30% smaller.
+JPEG_QUALITY = 85
+
+# Tiles larger than this are downsampled before upload. The model runs at
+# 640x640, so extra pixels only cost encode time and bandwidth.
+MAX_TILE_DIMENSION = 1024
+
+# Tiles whose strongest edge (per-channel Laplacian on a thumbnail with this
+# longest side) stays below BLANK_TILE_EDGE are treated as blank (bare wall,
+# ceiling) and not sent to the API. Edges rather than color spread, so a single
+# small hold still counts and evenly textured surfaces are never skipped.
+BLANK_TILE_THUMBNAIL = 256
+BLANK_TILE_EDGE = 30
+
+# On-disk cache of tile predictions, keyed by tile JPEG bytes + confidence
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "detect_holds"
+
+
+def _points_to_xy(points: List[Dict]) -> np.ndarray:
+    """Convert a list of {"x", "y"} point dicts to an (N, 2) array."""
+    return np.fromiter(
+        (v for p in points for v in (p["x"], p["y"])),
+        dtype=np.float64,
+        count=2 * len(points)
+    ).reshape(-1, 2)
+
+
+@njit(cache=True)
+def _dedup_kernel(
+    pairs: np.ndarray,
+    centers: np.ndarray,
+    confs: np.ndarray,
+    threshold: float
+) -> np.ndarray:
+    """Greedily resolve close (i, j) pairs, keeping the higher confidence one.
+
+    Pairs must be sorted by i then j, matching a pairwise scan in index order.
+    """
+    t2 = threshold * threshold
+    keep = np.ones(len(confs), np.bool_)
+    for k in range(len(pairs)):
+        i, j = pairs[k, 0], pairs[k, 1]
+        if not keep[i] or not keep[j]:
+            continue
+        # query_pairs is inclusive (<= r), duplicates are strictly closer.
+        # Compare squared distances to avoid the sqrt.
+        dx = centers[i, 0] - centers[j, 0]
+        dy = centers[i, 1] - centers[j, 1]
+        if dx * dx + dy * dy >= t2:
+            continue
+        if confs[i] >= confs[j]:
+            keep[j] = False
+        else:
+            keep[i] = False
+    return keep
+
+
+def deduplicate_predictions(
+    points: np.ndarray,
+    counts: np.ndarray,
+    confs: np.ndarray,
+    threshold: float = 20
+) -> np.ndarray:
+    """Find duplicate detections based on center proximity.
+
+    Takes the concatenated (P, 2) polygon points with per-prediction point
+    counts (all > 0) and confidences, and returns a boolean mask of
+    predictions to keep.
+    """
+    if not len(counts):
+        return np.zeros(0, np.bool_)
 
     # Calculate centers for all predictions
-    centers = []
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    centers = np.add.reduceat(points, offsets, axis=0) / counts[:, None]
+
+    # Find all pairs of centers within threshold in O(N log N) instead of
+    # comparing every pair. Sorted so pairs are resolved in index order.
+    pairs = cKDTree(centers).query_pairs(r=threshold, output_type='ndarray')
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+    return _dedup_kernel(pairs, centers, confs, threshold)
+
+
+def predictions_to_arrays(
+    predictions: List[Dict],
+    x1: int,
+    y1: int,
+    scale: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Convert one tile's predictions to arrays in full image space.
+
+    Returns (points, counts, confs, classes): every polygon's points
+    concatenated into a (P, 2) array, the number of points per prediction,
+    and per-prediction confidence and class. Bounding box predictions become
+    4-corner polygons.
+    """
+    polygons = []
     for pred in predictions:
         if "points" in pred:
-            cx = sum(p["x"] for p in pred["points"]) / len(pred["points"])
-            cy = sum(p["y"] for p in pred["points"]) / len(pred["points"])
+            polygons.append(_points_to_xy(pred["points"]))
         else:
-            cx, cy = pred.get("x", 0), pred.get("y", 0)
-        centers.append((cx, cy))
+            x, y = pred.get("x", 0), pred.get("y", 0)
+            w, h = pred.get("width", 0), pred.get("height", 0)
+            polygons.append(np.array([
+                [x - w/2, y - h/2], [x + w/2, y - h/2], [x + w/2, y + h/2], [x - w/2, y + h/2]
+            ], dtype=np.float64))
 
-    # Keep track of which predictions to keep
-    keep = [True] * len(predictions)
+    points = np.concatenate(polygons) if polygons else np.empty((0, 2))
+    counts = np.array([len(polygon) for polygon in polygons], dtype=np.int64)
+    confs = np.array([p.get("confidence", 0) for p in predictions], dtype=np.float64)
+    classes = np.array([p.get("class", "hold") for p in predictions], dtype=object)
 
-    for i in range(len(predictions)):
-        if not keep[i]:
-            continue
-        for j in range(i + 1, len(predictions)):
-            if not keep[j]:
-                continue
-            # Calculate distance between centers
-            dist = ((centers[i][0] - centers[j][0]) ** 2 +
-                   (centers[i][1] - centers[j][1]) ** 2) ** 0.5
-            if dist < threshold:
-                # Keep the one with higher confidence
-                if predictions[i].get("confidence", 0) >= predictions[j].get("confidence", 0):
-                    keep[j] = False
-                else:
-                    keep[i] = False
-                    break
-
-    return [p for p, k in zip(predictions, keep) if k]
-
-
-def call_api(image: np.ndarray, api_key: str, confidence: float, max_retries: int = 3) -> List[Dict]:
-    """Call Roboflow API for a single image tile with retries."""
-    _, buffer = cv2.imencode('.jpg', image)
-    img_base64 = base64.b64encode(buffer).decode('utf-8')
-
-    for attempt in range(max_retries):
-        response = requests.post(
-            API_URL,
-            params={
-                "api_key": api_key,
-                "confidence": int(confidence * 100),
-            },
-            data=img_base64,
-            headers={
-                "Content-Type": "application/x-www-form-urlencoded"
-            }
-        )
+    # Undo tile downsampling, then offset to full image space
+    return points / scale + (x1, y1), counts, confs, classes
 
-        if response.status_code == 200:
-            return response.json().get("predictions", [])
 
-        if response.status_code >= 500 and attempt < max_retries - 1:
-            wait = 2 ** attempt
-            print(f"    API returned {response.status_code}, retrying in {wait}s...")
-            time.sleep(wait)
-            continue
+def cache_path_for(jpeg: bytes, model: str, confidence: float) -> Path:
+    """Cache file for a tile's predictions from a given model/workflow."""
+    key = hashlib.sha256(jpeg + f"{model}:{confidence}".encode()).hexdigest()
+    return CACHE_DIR / f"{key}.json"
+
+
+def read_cache(cache_path: Path) -> Optional[List[Dict]]:
+    """Return cached predictions, or None on a miss."""
+    if not cache_path.exists():
+        return None
+    return orjson.loads(cache_path.read_bytes())
+
+
+def write_cache(cache_path: Path, predictions: List[Dict]) -> None:
+    """Atomically write predictions to the cache (safe with parallel tiles)."""
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile('wb', dir=cache_path.parent, suffix='.tmp', delete=False) as f:
+        f.write(orjson.dumps(predictions))
+    os.replace(f.name, cache_path)
+
+
+def is_blank_tile(image: np.ndarray) -> bool:
+    """Cheap check for tiles with almost no texture, so no holds to find."""
+    scale = BLANK_TILE_THUMBNAIL / max(image.shape[:2])
+    if scale < 1:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    edges = cv2.Laplacian(image, cv2.CV_16S)
+    return np.abs(edges).max() < BLANK_TILE_EDGE
+
+
+def encode_tile(image: np.ndarray) -> bytes:
+    """Encode an image tile as JPEG for upload."""
+    _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return buffer.tobytes()
+
+
+def call_api(
+    jpeg: bytes,
+    session: requests.Session,
+    api_key: str,
+    confidence: float,
+    use_cache: bool = True
+) -> List[Dict]:
+    """Call Roboflow API for a single JPEG-encoded image tile.
 
+    Retries on server errors are handled by the session's adapter. Responses
+    are cached on disk so re-running on the same image skips the network
+    entirely.
+    """
+    cache_path = cache_path_for(jpeg, MODEL_ENDPOINT, confidence)
+    if use_cache:
+        cached = read_cache(cache_path)
+        if cached is not None:
+            return cached
+
+    response = session.post(
+        API_URL,
+        params={
+            "api_key": api_key,
+            # Truncated so the server never filters more strictly than the
+            # client; extra predictions are dropped by the >= confidence check
+            "confidence": int(confidence * 100),
+        },
+        files={"file": ("tile.jpg", jpeg, "image/jpeg")}
+    )
+
+    if response.status_code != 200:
         raise Exception(f"API error: {response.status_code} - {response.text}")
 
-    return []
+    predictions = orjson.loads(response.content).get("predictions", [])
+    if use_cache:
+        write_cache(cache_path, predictions)
+    return predictions
+
+
+def call_workflow(
+    jpegs: List[bytes],
+    session: requests.Session,
+    api_key: str,
+    confidence: float,
+    workflow: str,
+    use_cache: bool = True
+) -> Optional[List[List[Dict]]]:
+    """Run all JPEG-encoded tiles through a Roboflow Workflow in one request.
+
+    The workflow must take an "image" input and expose the model's detections
+    as a "predictions" output. Returns one predictions list per tile, or None
+    if the batch request fails so the caller can fall back to per-tile calls.
+    """
+    cache_paths = [cache_path_for(jpeg, workflow, confidence) for jpeg in jpegs]
+    results = [read_cache(path) if use_cache else None for path in cache_paths]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if not missing:
+        return results
+
+    # Workflows take JSON, so images have to be base64 encoded here
+    response = session.post(
+        WORKFLOW_URL.format(workflow=workflow),
+        json={
+            "api_key": api_key,
+            "inputs": {
+                "image": [
+                    {"type": "base64", "value": base64.b64encode(jpegs[i]).decode('utf-8')}
+                    for i in missing
+                ],
+            },
+        }
+    )
+    if response.status_code != 200:
+        print(f"  Workflow returned {response.status_code}, falling back to per-tile requests")
+        return None
+
+    try:
+        outputs = orjson.loads(response.content).get("outputs", [])
+        batch = []
+        for output in outputs:
+            predictions = output.get("predictions", {})
+            # Detection blocks serialize as {"image": {...}, "predictions": [...]}
+            if isinstance(predictions, dict):
+                predictions = predictions.get("predictions", [])
+            if not isinstance(predictions, list):
+                raise ValueError(f"unexpected predictions output: {type(predictions).__name__}")
+            batch.append(predictions)
+    except (ValueError, AttributeError, TypeError) as e:
+        print(f"  Workflow returned a malformed response ({e}), falling back to per-tile requests")
+        return None
+
+    if len(batch) != len(missing):
+        print(f"  Workflow returned {len(batch)} results for {len(missing)} tiles, "
+              "falling back to per-tile requests")
+        return None
+
+    for i, predictions in zip(missing, batch):
+        results[i] = predictions
+        if use_cache:
+            write_cache(cache_paths[i], predictions)
+
+    return results
 
 
 def detect_holds(
     image_path: str,
     api_key: str,
     confidence: float = 0.5,
-    preview: bool = False
+    preview: bool = False,
+    preview_path: Optional[str] = None,
+    use_cache: bool = True,
+    workflow: Optional[str] = None,
+    adaptive: bool = True,
+    session: Optional[requests.Session] = None,
+    executor: Optional[ThreadPoolExecutor] = None
 ) -> List[Dict]:
     """
     Detect climbing holds using Roboflow hosted API with tiling.
@@ -118,6 +369,14 @@ def detect_holds(
         api_key: Roboflow API key
         confidence: Minimum confidence threshold (0-1)
         preview: If True, display detected holds overlay
+        preview_path: If set, write the overlay to this file instead of opening
+            a window (for headless environments)
+        use_cache: If False, always call the API instead of reusing cached tiles
+        workflow: Optional "workspace/workflow-id" to send all tiles in one
+            batched request, falling back to per-tile requests on failure
+        adaptive: If True, skip the API call for blank tiles
+        session: HTTP session for API calls (default: shared SESSION)
+        executor: Thread pool for API calls (default: shared IO_POOL)
 
     Returns:
         List of detected holds with polygon coordinates
@@ -153,126 +412,166 @@ def detect_holds(
     overlap_x = int(tile_width * overlap)
     overlap_y = int(tile_height * overlap)
 
-    all_predictions = []
-
-    print(f"Processing {tile_cols}x{tile_rows} tiles...")
+    # Calculate tile boundaries with overlap
+    tiles = []
     for row in range(tile_rows):
         for col in range(tile_cols):
-            # Calculate tile boundaries with overlap
             x1 = max(0, col * tile_width - overlap_x)
             y1 = max(0, row * tile_height - overlap_y)
             x2 = min(width, (col + 1) * tile_width + overlap_x)
             y2 = min(height, (row + 1) * tile_height + overlap_y)
 
             tile = image[y1:y2, x1:x2]
-            tile_h, tile_w = tile.shape[:2]
-
-            print(f"  Tile ({row},{col}): {tile_w}x{tile_h}...")
-            predictions = call_api(tile, api_key, confidence)
-            print(f"    Found {len(predictions)} holds")
-
-            # Adjust coordinates to full image space
-            for pred in predictions:
-                if "points" in pred:
-                    for point in pred["points"]:
-                        point["x"] = point["x"] + x1
-                        point["y"] = point["y"] + y1
-                else:
-                    pred["x"] = pred["x"] + x1
-                    pred["y"] = pred["y"] + y1
-
-            all_predictions.extend(predictions)
-
-    # Remove duplicates from overlap regions (based on center proximity)
-    print(f"Total before dedup: {len(all_predictions)}")
-    predictions = deduplicate_predictions(all_predictions, threshold=20)
-    print(f"After dedup: {len(predictions)}")
-
-    detected_holds = []
-    preview_image = image.copy() if preview else None
-
-    for pred in predictions:
-        # Get confidence
-        conf = pred.get("confidence", 0)
-        if conf < confidence:
-            continue
+            scale = min(1.0, MAX_TILE_DIMENSION / max(tile.shape[:2]))
+            if scale < 1:
+                tile = cv2.resize(tile, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            tiles.append((row, col, x1, y1, x2 - x1, y2 - y1, scale, tile))
+
+    if session is None:
+        session = SESSION
+    if executor is None:
+        executor = IO_POOL
+
+    def fetch(encoded: Future) -> List[Dict]:
+        return call_api(encoded.result(), session, api_key, confidence, use_cache=use_cache)
+
+    # Tiles are independent and the API round-trip dominates, so issue all
+    # requests concurrently. JPEG encoding runs in its own pool so later tiles
+    # are encoded while earlier ones are in flight (both OpenCV and requests
+    # release the GIL).
+    print(f"Processing {tile_cols}x{tile_rows} tiles...")
 
-        # Check for segmentation points
-        if "points" in pred:
-            # Instance segmentation with polygon points
-            polygon = []
-            for point in pred["points"]:
-                x_percent = (point["x"] / width) * 100
-                y_percent = (point["y"] / height) * 100
-                polygon.append({"x": round(x_percent, 2), "y": round(y_percent, 2)})
-
-            # Calculate center from polygon
-            if polygon:
-                center_x = sum(p["x"] for p in polygon) / len(polygon)
-                center_y = sum(p["y"] for p in polygon) / len(polygon)
-            else:
-                continue
-        else:
-            # Fallback to bounding box
-            x = pred.get("x", 0)
-            y = pred.get("y", 0)
-            w = pred.get("width", 0)
-            h = pred.get("height", 0)
-
-            # Convert bbox center coords to polygon corners
-            polygon = [
-                {"x": round(((x - w/2) / width) * 100, 2), "y": round(((y - h/2) / height) * 100, 2)},
-                {"x": round(((x + w/2) / width) * 100, 2), "y": round(((y - h/2) / height) * 100, 2)},
-                {"x": round(((x + w/2) / width) * 100, 2), "y": round(((y + h/2) / height) * 100, 2)},
-                {"x": round(((x - w/2) / width) * 100, 2), "y": round(((y + h/2) / height) * 100, 2)},
+    # Blank tiles (bare wall, ceiling) can't contain holds, skip their requests
+    blank = [adaptive and is_blank_tile(tile) for *_, tile in tiles]
+    for (row, col, _, _, tile_w, tile_h, *_), skip in zip(tiles, blank):
+        if skip:
+            print(f"  Tile ({row},{col}): {tile_w}x{tile_h}, blank, skipped")
+    pending = [tile for tile, skip in zip(tiles, blank) if not skip]
+
+    results = None
+    if workflow:
+        jpegs = list(ENCODE_POOL.map(encode_tile, [tile for *_, tile in pending]))
+        results = call_workflow(jpegs, session, api_key, confidence, workflow, use_cache=use_cache)
+        if results is not None:
+            for (row, col, _, _, tile_w, tile_h, *_), predictions in zip(pending, results):
+                print(f"  Tile ({row},{col}): {tile_w}x{tile_h}, found {len(predictions)} holds")
+
+    if results is None:
+        if workflow:
+            # The batch failed, reuse the tiles it already encoded
+            futures = [
+                executor.submit(call_api, jpeg, session, api_key, confidence, use_cache=use_cache)
+                for jpeg in jpegs
             ]
-            center_x = round((x / width) * 100, 2)
-            center_y = round((y / height) * 100, 2)
-
-        # Get class name
-        class_name = pred.get("class", "hold")
-
-        # Sample dominant color from center
-        cx_px = int((center_x / 100) * width)
-        cy_px = int((center_y / 100) * height)
-
-        sample_size = 5
-        x1 = max(0, cx_px - sample_size)
-        x2 = min(width, cx_px + sample_size)
-        y1 = max(0, cy_px - sample_size)
-        y2 = min(height, cy_px + sample_size)
-
-        region = image[y1:y2, x1:x2]
-        if region.size > 0:
-            mean_color = region.mean(axis=(0, 1))
-            dominant_color = "#{:02x}{:02x}{:02x}".format(
-                int(mean_color[2]), int(mean_color[1]), int(mean_color[0])
-            )
         else:
-            dominant_color = "#888888"
+            futures = [
+                executor.submit(fetch, ENCODE_POOL.submit(encode_tile, tile))
+                for *_, tile in pending
+            ]
+        tile_index = {future: i for i, future in enumerate(futures)}
+        for future in as_completed(futures):
+            row, col, _, _, tile_w, tile_h, *_ = pending[tile_index[future]]
+            print(f"  Tile ({row},{col}): {tile_w}x{tile_h}, found {len(future.result())} holds")
+        results = [future.result() for future in futures]
+
+    pending_results = iter(results)
+    results = [[] if skip else next(pending_results) for skip in blank]
+
+    # Merge in tile order so dedup tie-breaking stays deterministic. From
+    # here on predictions are kept as parallel arrays, with polygon points
+    # concatenated and split by per-prediction counts.
+    tile_arrays = []
+    for (_, _, x1, y1, _, _, scale, _), predictions in zip(tiles, results):
+        # Drop low-confidence detections before they reach dedup. The server
+        # threshold is a whole percent and workflows may not apply one at all.
+        predictions = [p for p in predictions if p.get("confidence", 0) >= confidence]
+        tile_arrays.append(predictions_to_arrays(predictions, x1, y1, scale))
+
+    points, counts, confs, classes = (np.concatenate(a) for a in zip(*tile_arrays))
 
-        hold = {
+    # Filter out predictions with empty points
+    nonempty = counts > 0
+    counts, confs, classes = counts[nonempty], confs[nonempty], classes[nonempty]
+
+    # Remove duplicates from overlap regions (based on center proximity)
+    print(f"Total before dedup: {len(counts)}")
+    keep = deduplicate_predictions(points, counts, confs, threshold=20)
+    points = points[np.repeat(keep, counts)]
+    counts, confs, classes = counts[keep], confs[keep], classes[keep]
+    print(f"After dedup: {len(counts)}")
+
+    # Convert to percentages. Rounding uses Python's round() per value to
+    # match the polygon dicts the app has always received.
+    pct = points / (width, height) * 100
+    rounded = [round(v, 2) for v in pct.ravel().tolist()]
+    offsets = np.concatenate(([0], np.cumsum(counts))).tolist()
+
+    polygons, centers = [], []
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        xs = rounded[2 * start:2 * end:2]
+        ys = rounded[2 * start + 1:2 * end:2]
+        polygons.append([{"x": x, "y": y} for x, y in zip(xs, ys)])
+        # Calculate center from polygon
+        centers.append((sum(xs) / len(xs), sum(ys) / len(ys)))
+
+    # Sample dominant color from a 10x10 window around every center at once,
+    # using a summed-area table (four lookups per hold instead of a slice +
+    # reduction). float64 because int32 sums overflow on 4096px images.
+    integral = cv2.integral(image, sdepth=cv2.CV_64F)
+
+    centers_px = (np.array(centers, dtype=np.float64).reshape(-1, 2) / 100 * (width, height)).astype(np.int64)
+    sample_size = 5
+    x1s = np.maximum(0, centers_px[:, 0] - sample_size)
+    x2s = np.minimum(width, centers_px[:, 0] + sample_size)
+    y1s = np.maximum(0, centers_px[:, 1] - sample_size)
+    y2s = np.minimum(height, centers_px[:, 1] + sample_size)
+    valid = (x2s > x1s) & (y2s > y1s)
+
+    # Empty windows (centers outside the image) are clamped so they index
+    # safely, and get the fallback color below
+    x1s, x2s = np.clip(x1s, 0, width), np.clip(x2s, 0, width)
+    y1s, y2s = np.clip(y1s, 0, height), np.clip(y2s, 0, height)
+    areas = np.where(valid, (x2s - x1s) * (y2s - y1s), 1)
+
+    means = (
+        integral[y2s, x2s] - integral[y1s, x2s] - integral[y2s, x1s] + integral[y1s, x1s]
+    ) / areas[:, None]
+    colors = [
+        "#{:02x}{:02x}{:02x}".format(int(r), int(g), int(b)) if ok else "#888888"
+        for (b, g, r), ok in zip(means.tolist(), valid.tolist())
+    ]
+
+    detected_holds = [
+        {
             "polygon": polygon,
             "center": {"x": round(center_x, 2), "y": round(center_y, 2)},
             "dominant_color": dominant_color,
             "confidence": round(conf, 3),
             "class": class_name
         }
-        detected_holds.append(hold)
-
-        # Draw on preview
-        if preview and polygon:
-            pts = np.array([
-                [int(p["x"] / 100 * width), int(p["y"] / 100 * height)]
-                for p in polygon
-            ], np.int32)
-            cv2.polylines(preview_image, [pts], True, (0, 255, 0), 1)
+        for polygon, (center_x, center_y), dominant_color, conf, class_name
+        in zip(polygons, centers, colors, confs.tolist(), classes.tolist())
+    ]
+
+    # Draw on preview (all outlines in a single polylines call)
+    if preview or preview_path:
+        preview_image = image.copy()
+        pts_px = (np.array(rounded).reshape(-1, 2) / 100 * (width, height)).astype(np.int32)
+        all_pts = np.split(pts_px, offsets[1:-1])
+        cv2.polylines(preview_image, all_pts, True, (0, 255, 0), 1)
+        for cx_px, cy_px in centers_px.tolist():
             cv2.circle(preview_image, (cx_px, cy_px), 3, (255, 0, 0), -1)
 
-    if preview:
-        cv2.imshow('Detected Holds', preview_image)
-        cv2.waitKey(0)
-        cv2.destroyAllWindows()
+        if preview_path:
+            cv2.imwrite(str(preview_path), preview_image)
+            print(f"Saved preview to {preview_path}")
+        else:
+            try:
+                cv2.imshow('Detected Holds', preview_image)
+                cv2.waitKey(0)
+                cv2.destroyAllWindows()
+            except cv2.error:
+                print("Could not open preview window (headless?), use --preview-output instead")
 
     print(f"Detected {len(detected_holds)} holds")
     return detected_holds
@@ -280,15 +579,40 @@ def detect_holds(
 
 def main():
     parser = argparse.ArgumentParser(description='Detect climbing holds using Roboflow ML model')
-    parser.add_argument('image', help='Path to input image')
-    parser.add_argument('--output', '-o', help='Output JSON file path', default=None)
+    parser.add_argument('images', nargs='*', metavar='image',
+                       help='Path to input image (several can be given)')
+    parser.add_argument('--output', '-o', help='Output JSON file path (single image only)', default=None)
+    parser.add_argument('--compact', action='store_true',
+                       help='Write compact JSON instead of indented (smaller file)')
     parser.add_argument('--preview', '-p', action='store_true',
                        help='Show preview window with detections')
+    parser.add_argument('--preview-output', default=None,
+                       help='Write preview image with detections to this file instead of showing a window')
     parser.add_argument('--confidence', '-c', type=float, default=0.5,
                        help='Minimum confidence threshold (0-1, default: 0.5)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Always call the API, ignoring cached tile results')
+    parser.add_argument('--clear-cache', action='store_true',
+                       help=f'Delete cached tile results ({CACHE_DIR})')
+    parser.add_argument('--workflow', '-w', default=None,
+                       help='Roboflow Workflow (workspace/workflow-id) to send all tiles '
+                            'in one batched request')
+    parser.add_argument('--no-adaptive', action='store_true',
+                       help='Send every tile to the API, even ones that look blank')
 
     args = parser.parse_args()
 
+    if args.clear_cache:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        print(f"Cleared cache at {CACHE_DIR}")
+        if not args.images:
+            return
+
+    if not args.images:
+        parser.error('the following arguments are required: image')
+    if len(args.images) > 1 and (args.output or args.preview_output):
+        parser.error('--output and --preview-output require a single image')
+
     # Get API key
     api_key = os.environ.get('ROBOFLOW_API_KEY')
     if not api_key:
@@ -296,26 +620,36 @@ def main():
         print("Get your API key from https://app.roboflow.com/settings/api")
         exit(1)
 
-    # Detect holds
-    holds = detect_holds(
-        args.image,
-        api_key=api_key,
-        confidence=args.confidence,
-        preview=args.preview
-    )
+    # All images share one HTTP session and request pool, so connections and
+    # workers stay warm between them
+    with make_session() as session, \
+            ThreadPoolExecutor(max_workers=MAX_CONNECTIONS) as executor:
+        for image_path in args.images:
+            holds = detect_holds(
+                image_path,
+                api_key=api_key,
+                confidence=args.confidence,
+                preview=args.preview,
+                preview_path=args.preview_output,
+                use_cache=not args.no_cache,
+                workflow=args.workflow,
+                adaptive=not args.no_adaptive,
+                session=session,
+                executor=executor
+            )
 
-    # Determine output path
-    if args.output:
-        output_path = args.output
-    else:
-        input_path = Path(args.image)
-        output_path = input_path.parent / f"{input_path.stem}-detected-holds.json"
+            # Determine output path
+            if args.output:
+                output_path = args.output
+            else:
+                input_path = Path(image_path)
+                output_path = input_path.parent / f"{input_path.stem}-detected-holds.json"
 
-    # Write JSON output
-    with open(output_path, 'w') as f:
-        json.dump(holds, f, indent=2)
+            # Write JSON output
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps(holds, option=None if args.compact else orjson.OPT_INDENT_2))
 
-    print(f"Saved {len(holds)} detected holds to {output_path}")
+            print(f"Saved {len(holds)} detected holds to {output_path}")
 
 
 if __name__ == '__main__':